@@ -49,5 +49,6 @@ with orhelper.OpenRocketInstance() as instance:
 
     ax1.grid(True)
 
-# Leave OpenRocketInstance context before showing plot in order to shutdown JVM first
+# Shutdown the JVM before showing plot
+orhelper.shutdown()
 plt.show()
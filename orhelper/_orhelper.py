@@ -1,7 +1,10 @@
+import gc
 import os
 import logging
+import subprocess
+import sys
 from copy import copy
-from typing import Union, List, Iterable, Dict
+from typing import Union, List, Iterable, Dict, Optional
 
 import jpype
 import jpype.imports
@@ -13,26 +16,49 @@ logger = logging.getLogger(__name__)
 
 CLASSPATH = os.environ.get("CLASSPATH", "OpenRocket.jar")
 
+_LISTENER_INTERFACES = None
+
+# Number of entered OpenRocketInstances and the _Jvm they share, see OpenRocketInstance.__enter__
+_JVM_REFCOUNT = 0
+_JVM_SINGLETON = None
+
 __all__ = [
     'OpenRocketInstance',
     'AbstractSimulationListener',
     'Helper',
     'JIterator',
+    'shutdown',
 ]
 
 class OpenRocketInstance:
     """ This class is designed to be called using the 'with' construct. This
-        will ensure that no matter what happens within that context, the 
-        JVM will always be shutdown.
+        will ensure that no matter what happens within that context, any
+        OpenRocket windows are always disposed of.
+
+        The JVM is started by the first instance to be entered and then kept
+        running, so that later instances can reuse it without starting
+        OpenRocket again. Options which apply to the JVM itself (jar_path,
+        cross_gc and cds_archive) therefore only take effect for that first
+        instance. The JVM is shut down when python exits, or explicitly by
+        calling orhelper.shutdown().
     """
 
-    def __init__(self, jar_path: str = CLASSPATH, log_level: Union[OrLogLevel, str] = OrLogLevel.ERROR):
+    def __init__(self, jar_path: str = CLASSPATH, log_level: Union[OrLogLevel, str] = OrLogLevel.ERROR,
+                 cross_gc: bool = False, cds_archive: Optional[str] = None):
         """ jar_path is the full path of the OpenRocket .jar file to use
             log_level can be either OFF, ERROR, WARN, INFO, DEBUG, TRACE and ALL
+            cross_gc enables JPype's hook which triggers a Java garbage collection from every python garbage collection.
+            It is off by default as it slows down all python code running alongside OpenRocket, the JVM still
+            collects garbage on its own schedule without it.
+            cds_archive is an optional path to a class data sharing archive created by generate_cds_archive, which
+            is used to speed up starting the JVM if it exists.
         """
         self.openrocket_core = None
         self.openrocket_swing = None
         self.started = False
+        self.cross_gc = cross_gc
+        self.cds_archive = cds_archive
+        self._jvm_options = []
 
         if not os.path.exists(jar_path):
             raise FileNotFoundError(f"Jar file {os.path.abspath(jar_path)} does not exist")
@@ -44,27 +70,73 @@ class OpenRocketInstance:
             self.or_log_level = log_level
 
     def __enter__(self):
+        global _JVM_REFCOUNT, _JVM_SINGLETON
+
+        # The JVM can't be restarted within a process, so it is started once and shared by every instance
+        if _JVM_SINGLETON is None:
+            _JVM_SINGLETON = self._start_jvm()
+        elif _JVM_SINGLETON.options != self._jvm_settings():
+            logger.warning(f"The JVM is already running with {_JVM_SINGLETON.options}, ignoring the JVM options "
+                           f"{self._jvm_settings()} of this OpenRocketInstance")
+        _JVM_REFCOUNT += 1
+
+        jvm = _JVM_SINGLETON
+        self.openrocket_core = jvm.openrocket_core
+        self.openrocket_swing = jvm.openrocket_swing
+        self._SimulationListener = jvm.SimulationListener
+        self._FlightDataType = jvm.FlightDataType
+        self._FlightEventType = jvm.FlightEventType
+        self._Level = jvm.Level
+        self._Window = jvm.Window
+        self._Arrays = jvm.Arrays
+        self._dispose_window = jvm.dispose_window
+        self._or_logger = jvm.or_logger
+
+        self._or_logger.setLevel(self._translate_log_level())
+
+        self.started = True
+
+        return self
+
+    def __exit__(self, ex, value, tb):
+        global _JVM_REFCOUNT
+
+        # Dispose any open windows (usually just a loading screen) which can prevent the JVM from shutting down, the
+        # loop over the windows runs on the Java side
+        self._Arrays.stream(self._Window.getWindows()).forEach(self._dispose_window)
+
+        _JVM_REFCOUNT -= 1
+        self.started = False
+
+        if ex is not None:
+            logger.exception("Exception while calling OpenRocket", exc_info=(ex, value, tb))
+
+    def _start_jvm(self):
+        """ Starts the JVM and OpenRocket, returns the _Jvm to be shared by all instances """
         jvm_path = jpype.getDefaultJVMPath()
 
         logger.info(f"Starting JVM from {jvm_path} CLASSPATH={self.jar_path}")
 
-        jpype.startJVM(jvm_path, "-ea", f"-Djava.class.path={self.jar_path}")
+        if not self.cross_gc:
+            _disable_cross_gc()
+
+        jpype.startJVM(jvm_path, "-ea", f"-Djava.class.path={self.jar_path}", *self._cds_options(), *self._jvm_options)
 
         # ----- Java imports -----
-        self.openrocket_core = jpype.JPackage("info").openrocket.core
-        self.openrocket_swing = jpype.JPackage("info").openrocket.swing
+        openrocket_core = jpype.JPackage("info").openrocket.core
+        openrocket_swing = jpype.JPackage("info").openrocket.swing
         guice = jpype.JPackage("com").google.inject.Guice
         LoggerFactory = jpype.JPackage("org").slf4j.LoggerFactory
         Logger = jpype.JPackage("ch").qos.logback.classic.Logger
         # -----
 
         # Effectively a minimally viable translation of openrocket.startup.SwingStartup
-        gui_module = self.openrocket_swing.startup.GuiModule()
-        plugin_module = self.openrocket_core.plugin.PluginModule()
+        gui_module = openrocket_swing.startup.GuiModule()
+        plugin_module = openrocket_core.plugin.PluginModule()
 
         injector = guice.createInjector(gui_module, plugin_module)
 
-        app = self.openrocket_core.startup.Application
+        app = openrocket_core.startup.Application
         app.setInjector(injector)
 
         gui_module.startLoader()
@@ -76,37 +148,121 @@ class OpenRocketInstance:
         motor_loader = _get_private_field(gui_module, "motorLoader")
         motor_loader.blockUntilLoaded()
 
-        or_logger = LoggerFactory.getLogger(Logger.ROOT_LOGGER_NAME)
-        or_logger.setLevel(self._translate_log_level())
+        return _Jvm(self._jvm_settings(), openrocket_core, openrocket_swing,
+                    LoggerFactory.getLogger(Logger.ROOT_LOGGER_NAME))
 
-        self.started = True
+    def _jvm_settings(self):
+        """ The options which only take effect when starting the JVM """
+        return {"jar_path": self.jar_path, "cross_gc": self.cross_gc, "cds_archive": self.cds_archive,
+                "jvm_options": tuple(self._jvm_options)}
 
-        return self
-
-    def __exit__(self, ex, value, tb):
+    def generate_cds_archive(self, path: str):
+        """ Records a class data sharing archive of all the classes loaded while starting OpenRocket to path, to be
+            passed as cds_archive later. The JVM can't be restarted within a process, so this starts OpenRocket once
+            in a separate python process and must be called before entering any OpenRocketInstance that should use it.
+        """
+        script = (
+            "import sys, orhelper\n"
+            "instance = orhelper.OpenRocketInstance(sys.argv[1], sys.argv[2])\n"
+            "instance._jvm_options.append('-XX:ArchiveClassesAtExit=' + sys.argv[3])\n"
+            "with instance:\n"
+            "    orhelper.Helper(instance)\n"
+            "orhelper.shutdown()\n"
+        )
 
-        # Dispose any open windows (usually just a loading screen) which can prevent the JVM from shutting down
-        for window in jpype.java.awt.Window.getWindows():
-            window.dispose()
+        # Make sure the child process imports this same orhelper
+        env = dict(os.environ)
+        package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, (package_root, env.get("PYTHONPATH"))))
 
-        jpype.shutdownJVM()
-        logger.info("JVM shut down")
-        self.started = False
+        logger.info(f"Generating CDS archive {path}")
+        subprocess.run([sys.executable, "-c", script, self.jar_path, self.or_log_level.name, os.path.abspath(path)],
+                       env=env, check=True)
 
-        if ex is not None:
-            logger.exception("Exception while calling OpenRocket", exc_info=(ex, value, tb))
+    def _cds_options(self):
+        if self.cds_archive is None:
+            return []
+        if not os.path.exists(self.cds_archive):
+            logger.info(f"CDS archive {self.cds_archive} does not exist, starting the JVM without it")
+            return []
+        return ["-Xshare:auto", f"-XX:SharedArchiveFile={self.cds_archive}"]
 
     def _translate_log_level(self):
-        # ----- Java imports -----
-        Level = jpype.JPackage("ch").qos.logback.classic.Level
-        # -----
+        return getattr(self._Level, self.or_log_level.name)
+
+
+class _Jvm:
+    """ The running JVM shared by all OpenRocketInstances, along with the java handles they use """
 
-        return getattr(Level, self.or_log_level.name)
+    def __init__(self, options, openrocket_core, openrocket_swing, or_logger):
+        self.options = options
+        self.openrocket_core = openrocket_core
+        self.openrocket_swing = openrocket_swing
+        self.or_logger = or_logger
 
+        # Java classes used after startup, resolved once here rather than walking the packages on every call
+        self.SimulationListener = _listener_interfaces()[0]
+        self.FlightDataType = openrocket_core.simulation.FlightDataType
+        self.FlightEventType = openrocket_core.simulation.FlightEvent.Type
+        self.Level = jpype.JPackage("ch").qos.logback.classic.Level
+        self.Window = jpype.java.awt.Window
+        self.Arrays = jpype.java.util.Arrays
+        self.dispose_window = _java_function(jpype.java.util.function.Consumer,
+                                             _find_virtual(self.Window, "dispose", jpype.java.lang.Void.TYPE))
+
+
+def shutdown():
+    """ Shuts down the JVM shared by all OpenRocketInstances. This is final, the JVM can't be started again within the
+        same python process. It is also shut down automatically when python exits.
+    """
+    global _JVM_SINGLETON
+
+    if _JVM_REFCOUNT > 0:
+        raise RuntimeError("Can't shut down the JVM while an OpenRocketInstance is still in use")
+    if _JVM_SINGLETON is None:
+        return
+
+    jpype.shutdownJVM()
+    logger.info("JVM shut down")
+    _JVM_SINGLETON = None
+
+
+# Methods of the SimulationEventListener and SimulationComputationListener interfaces
+_EVENT_LISTENER_METHODS = (
+    'addFlightEvent',
+    'handleFlightEvent',
+    'motorIgnition',
+    'recoveryDeviceDeployment',
+)
+_COMPUTATION_LISTENER_METHODS = (
+    'preAccelerationCalculation',
+    'preAerodynamicCalculation',
+    'preAtmosphericModel',
+    'preFlightConditions',
+    'preGravityModel',
+    'preMassCalculation',
+    'preSimpleThrustCalculation',
+    'preWindModel',
+    'postAccelerationCalculation',
+    'postAerodynamicCalculation',
+    'postAtmosphericModel',
+    'postFlightConditions',
+    'postGravityModel',
+    'postMassCalculation',
+    'postSimpleThrustCalculation',
+    'postWindModel',
+)
 
 class AbstractSimulationListener:
     """ This is a python implementation of openrocket.simulation.listeners.AbstractSimulationListener.
         Subclasses of this are suitable for passing to helper.run_simulation.
+
+        Listener methods are called from java through a JProxy, which is comparatively expensive. The SimulationListener
+        methods (startSimulation, preStep, postStep, endSimulation, isSystemListener) are always called this way,
+        whether they are overridden or not, so preStep/postStep cross into python on every time step. The
+        SimulationEventListener and SimulationComputationListener callbacks are skipped entirely as long as none of
+        that interface's methods are overridden, overriding any one of them means all of that interface's methods are
+        called.
     """
 
     def __str__(self):
@@ -199,12 +355,39 @@ class AbstractSimulationListener:
         return None
 
     def clone(self):
-        return jpype.JProxy((
-            jpype.JPackage("info").openrocket.core.simulation.listeners.SimulationListener,
-            jpype.JPackage("info").openrocket.core.simulation.listeners.SimulationEventListener,
-            jpype.JPackage("info").openrocket.core.simulation.listeners.SimulationComputationListener,
-            jpype.java.lang.Cloneable,),
-            inst=copy(self))
+        listener = copy(self)
+        listener._jproxy = None  # Don't share the proxy of the listener we were copied from
+        return listener._as_proxy()
+
+    def _as_proxy(self):
+        """ Returns the JProxy used to hand this listener to java, it is created once and reused for every simulation """
+        proxy = getattr(self, "_jproxy", None)
+        if proxy is None:
+            proxy = jpype.JProxy(self._proxy_interfaces(), inst=self)
+            self._jproxy = proxy
+        return proxy
+
+    @classmethod
+    def _proxy_interfaces(cls):
+        """ Returns the java interfaces to proxy for this class. SimulationEventListener and
+            SimulationComputationListener are only included if the class overrides one of their methods, OpenRocket
+            only calls those methods on listeners implementing them so the defaults never have to call into python.
+        """
+        interfaces = cls.__dict__.get("_proxy_ifaces")
+        if interfaces is None:
+            listener, event_listener, computation_listener, cloneable = _listener_interfaces()
+            interfaces = (listener,)
+            if cls._overrides(_EVENT_LISTENER_METHODS):
+                interfaces += (event_listener,)
+            if cls._overrides(_COMPUTATION_LISTENER_METHODS):
+                interfaces += (computation_listener,)
+            interfaces += (cloneable,)
+            cls._proxy_ifaces = interfaces
+        return interfaces
+
+    @classmethod
+    def _overrides(cls, method_names):
+        return any(getattr(cls, name) is not getattr(AbstractSimulationListener, name) for name in method_names)
 
 
 class Helper:
@@ -220,6 +403,51 @@ class Helper:
 
         self.openrocket_core = open_rocket_instance.openrocket_core
         self.openrocket_swing = open_rocket_instance.openrocket_swing
+        self._SimulationListener = open_rocket_instance._SimulationListener
+        self._FlightDataType = open_rocket_instance._FlightDataType
+        self._FlightEventType = open_rocket_instance._FlightEventType
+
+        # Unboxes a java.lang.Double entirely on the Java side, used to turn timeseries into double[]
+        self._to_double = _java_function(
+            jpype.java.util.function.ToDoubleFunction,
+            _find_virtual(jpype.java.lang.Double, "doubleValue", jpype.java.lang.Double.TYPE)
+        )
+
+        # Java FlightDataType objects are resolved on first use, FlightEvent types are all resolved up front into a
+        # tuple indexed by the ordinal of the java FlightEvent.Type
+        self._fdt_cache = dict()
+        flight_events = {x.name: x for x in FlightEvent}
+        java_event_names = [str(t.name()) for t in self._FlightEventType.values()]
+        self._fe_by_ordinal = tuple(flight_events.get(name) for name in java_event_names)
+        unmapped = [name for name in java_event_names if name not in flight_events]
+        if unmapped:
+            logger.warning(f"Java flight event types {unmapped} have no FlightEvent counterpart, get_events will skip "
+                           f"them")
+
+        # FlightEvent -> getType().ordinal() and FlightEvent -> getTime(), used by get_events to read all events at once
+        FlightEventClass = self.openrocket_core.simulation.FlightEvent
+        self._event_ordinal = _java_function(
+            jpype.java.util.function.ToIntFunction,
+            jpype.java.lang.invoke.MethodHandles.filterReturnValue(
+                _find_virtual(FlightEventClass, "getType", self._FlightEventType),
+                _find_virtual(self._FlightEventType, "ordinal", jpype.java.lang.Integer.TYPE)
+            )
+        )
+        self._event_time = _java_function(
+            jpype.java.util.function.ToDoubleFunction,
+            _find_virtual(FlightEventClass, "getTime", jpype.java.lang.Double.TYPE)
+        )
+
+        # (name, component) -> Objects.equals(name, component.getName()), used by get_component_named to search the
+        # component tree without calling back into python for every component
+        MethodHandles = jpype.java.lang.invoke.MethodHandles
+        MethodType = jpype.java.lang.invoke.MethodType
+        Object = jpype.java.lang.Object
+        RocketComponent = self.openrocket_core.rocketcomponent.RocketComponent
+        get_name = _find_virtual(RocketComponent, "getName", jpype.java.lang.String) \
+            .asType(MethodType.methodType(Object, RocketComponent))
+        equals = _find_static(jpype.java.util.Objects, "equals", jpype.java.lang.Boolean.TYPE, Object, Object)
+        self._name_equals = MethodHandles.filterArguments(equals, 1, get_name)
 
     def load_doc(self, or_filename):
         """ Loads a .ork file and returns the corresponding openrocket document """
@@ -236,32 +464,24 @@ class Helper:
         saver = self.openrocket_core.file.GeneralRocketSaver()
         saver.save(or_java_file, doc)
 
-    def run_simulation(self, sim, listeners: List[AbstractSimulationListener] = None):
+    def run_simulation(self, sim, listeners: List[AbstractSimulationListener] = None, randomize_seed: bool = True):
         """ This is a wrapper to the Simulation.simulate() for running a simulation
             The optional listeners parameter is a sequence of objects which extend orh.AbstractSimulationListener.
+            Set randomize_seed to False when managing the simulation seed yourself, e.g. for reproducible runs.
         """
 
-        if listeners is None:
-            # this method takes in a vararg of SimulationListeners, which is just a fancy way of passing in an array, so
-            # we have to pass in an array of length 0 ..
-            listener_array = jpype.JArray(
-                self.openrocket_core.simulation.listeners.AbstractSimulationListener, 1
-            )(0)
-        else:
-            listener_array = [
-                jpype.JProxy(
-                    (
-                        self.openrocket_core.simulation.listeners.SimulationListener,
-                        self.openrocket_core.simulation.listeners.SimulationEventListener,
-                        self.openrocket_core.simulation.listeners.SimulationComputationListener,
-                        jpype.java.lang.Cloneable,
-                    ),
-                    inst=c,
-                )
-                for c in listeners
-            ]
-
-        sim.getOptions().randomizeSeed()  # Need to do this otherwise exact same numbers will be generated for each identical run
+        listeners = () if listeners is None else tuple(listeners)
+
+        # this method takes in a vararg of SimulationListeners, which is just a fancy way of passing in an array, so we
+        # fill a SimulationListener[] directly rather than having jpype convert a python list for us
+        listener_array = jpype.JArray(self._SimulationListener, 1)(len(listeners))
+        for i, c in enumerate(listeners):
+            # Anything else (e.g. a JProxy or a java listener) is already usable by java as is
+            listener_array[i] = c._as_proxy() if isinstance(c, AbstractSimulationListener) else c
+
+        if randomize_seed:
+            options = sim.getOptions()
+            options.randomizeSeed()  # Need to do this otherwise exact same numbers will be generated for each identical run
         sim.simulate(listener_array)
 
     def translate_flight_data_type(self, flight_data_type:Union[FlightDataType, str]):
@@ -272,26 +492,55 @@ class Helper:
         else:
             raise TypeError("Invalid type for flight_data_type")
 
-        return getattr(self.openrocket_core.simulation.FlightDataType, name)
+        java_type = self._fdt_cache.get(name)
+        if java_type is None:
+            java_type = getattr(self._FlightDataType, name)
+            self._fdt_cache[name] = java_type
+        return java_type
 
-    def get_timeseries(self, simulation, variables: Iterable[Union[FlightDataType, str]], branch_number=0) \
-            -> Dict[Union[FlightDataType, str], np.array]:
+    def get_timeseries(self, simulation, variables: Iterable[Union[FlightDataType, str]], branch_number=0,
+                       dtype=np.float64) -> Dict[Union[FlightDataType, str], np.array]:
         """
         Gets a dictionary of timeseries data (as numpy arrays) from a simulation given specific variable names.
 
         :param simulation: An openrocket simulation object.
         :param variables: A sequence of FlightDataType or strings representing the desired variables
         :param branch_number:
+        :param dtype: numpy dtype of the returned arrays, e.g. np.float32 to halve their size
         :return:
+        :raises ValueError: if the simulation has no data for one of the variables
         """
 
         branch = simulation.getSimulatedData().getBranch(branch_number)
         output = dict()
         for v in variables:
-            output[v] = np.array(branch.get(self.translate_flight_data_type(v)))
+            # Unbox the List<Double> into a double[] on the Java side, numpy can then copy it in one go through the
+            # buffer protocol instead of converting every element to a python float
+            values = self._get_branch_values(branch, v).stream().mapToDouble(self._to_double).toArray()
+            output[v] = np.array(memoryview(values), dtype=dtype)
 
         return output
 
+    def reduce(self, simulation, variables: Iterable[Union[FlightDataType, str]], func, branch_number=0):
+        """
+        Calls func with the timeseries of the given variables (as numpy arrays, in the same order) and returns its
+        result, e.g. the maximum dynamic pressure or the apogee of a simulation.
+
+        func is intended to be a numba kernel, e.g. decorated with @numba.njit(cache=True). With cache=True numba
+        only compiles func once and stores it in __pycache__ (or in the NUMBA_CACHE_DIR environment variable if set),
+        rather than compiling it again every time the script is run. Any other python callable works as well.
+
+        :param simulation: An openrocket simulation object.
+        :param variables: A sequence of FlightDataType or strings representing the arguments of func
+        :param func: The reduction to evaluate
+        :param branch_number:
+        :return: The value returned by func
+        """
+
+        variables = list(variables)
+        data = self.get_timeseries(simulation, variables, branch_number)
+        return func(*(data[v] for v in variables))
+
     def get_final_values(self, simulation, variables: Iterable[Union[FlightDataType, str]], branch_number=0) \
             -> Dict[Union[FlightDataType, str], float]:
         """
@@ -301,17 +550,32 @@ class Helper:
         :param variables: A sequence of FlightDataType or strings representing the desired variables
         :param branch_number:
         :return:
+        :raises ValueError: if the simulation has no data for one of the variables
         """
 
         branch = simulation.getSimulatedData().getBranch(branch_number)
         output = dict()
         for v in variables:
-            output[v] = branch.get(self.translate_flight_data_type(v))[-1]
+            # Only read the last element on the Java side rather than converting the whole list
+            values = self._get_branch_values(branch, v)
+            output[v] = float(values.get(values.size() - 1))
 
         return output
 
+    def _get_branch_values(self, branch, variable):
+        """ Returns the java list of values of variable in a FlightDataBranch, raises a ValueError if the branch has
+            no data for it
+        """
+        values = branch.get(self.translate_flight_data_type(variable))
+        if values is None:
+            raise ValueError(f"Flight data branch {branch.getName()} has no data for {variable}")
+        return values
+
     def translate_flight_event(self, flight_event) -> FlightEvent:
-        return {getattr(self.openrocket_core.simulation.FlightEvent.Type, x.name): x for x in FlightEvent}[flight_event]
+        event = self._fe_by_ordinal[flight_event.ordinal()]
+        if event is None:
+            raise ValueError(f"Java flight event type {flight_event.name()} has no FlightEvent counterpart")
+        return event
 
     def get_events(self, simulation) -> Dict[FlightEvent, float]:
         """Returns a dictionary of all the flight events in a given simulation.
@@ -319,13 +583,20 @@ class Helper:
         """
         branch = simulation.getSimulatedData().getBranch(0)
 
+        # Read the event types and times as int[] and double[], which are copied out in bulk through the buffer protocol
+        events = branch.getEvents()
+        ordinals = memoryview(events.stream().mapToInt(self._event_ordinal).toArray()).tolist()
+        times = memoryview(events.stream().mapToDouble(self._event_time).toArray()).tolist()
+
         output = dict()
-        for ev in branch.getEvents():
-            type = self.translate_flight_event(ev.getType())
+        for ordinal, time in zip(ordinals, times):
+            type = self._fe_by_ordinal[ordinal]
+            if type is None:
+                continue  # Not mirrored in FlightEvent, see Helper.__init__
             if type in output:
-                output[type].append(float(ev.getTime()))
+                output[type].append(time)
             else:
-                output[type] = [float(ev.getTime())]
+                output[type] = [time]
 
         return output
 
@@ -335,27 +606,103 @@ class Helper:
             Raises a ValueError if no component found.
         """
 
-        for component in JIterator(root):
-            if component.getName() == name:
-                return component
-        raise ValueError(root.toString() + " has no component named " + name)
+        # Java does the whole search, so this costs the same handful of calls regardless of the size of the tree
+        has_name = _java_function(
+            jpype.java.util.function.Predicate,
+            jpype.java.lang.invoke.MethodHandles.insertArguments(self._name_equals, 0, jpype.JString(name))
+        )
+        components = jpype.java.util.stream.StreamSupport.stream(
+            jpype.java.util.Spliterators.spliteratorUnknownSize(root.iterator(True), 0), False
+        )
+
+        component = components.filter(has_name).findFirst().orElse(None)
+        if component is None:
+            raise ValueError(root.toString() + " has no component named " + name)
+        return component
 
 
 class JIterator:
     """This class is a wrapper for java iterators to allow them to be used as python iterators"""
 
+    # Number of elements fetched from java at once
+    batch_size = 1024
+
     def __init__(self, jit):
         """Give this any java object which implements iterable"""
         self.jit = jit.iterator(True)
+        self._buf = []
+        self._pos = 0
+        self._exhausted = False
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        if not self.jit.hasNext():
-            raise StopIteration()
+        if self._pos >= len(self._buf):
+            self._fill()
+            if not self._buf:
+                raise StopIteration()
+
+        element = self._buf[self._pos]
+        self._pos += 1
+        return element
+
+    def _fill(self):
+        """ Pulls the next batch_size elements off the java iterator in one go instead of calling hasNext/next on
+            every element
+        """
+        if self._exhausted:
+            self._buf = []
         else:
-            return next(self.jit)
+            batch = jpype.java.util.stream.StreamSupport.stream(
+                jpype.java.util.Spliterators.spliteratorUnknownSize(self.jit, 0), False
+            ).limit(self.batch_size).toArray()
+            self._buf = list(batch)
+            self._exhausted = len(self._buf) < self.batch_size
+        self._pos = 0
+
+def _disable_cross_gc():
+    """ Stops JPype from running a Java garbage collection alongside every python garbage collection """
+    collect = getattr(jpype._jpype, "_collect", None)
+    if collect is not None and collect in gc.callbacks:
+        gc.callbacks.remove(collect)
+    else:
+        logger.debug("JPype's garbage collection hook was not found in gc.callbacks, leaving it as is")
+
+def _listener_interfaces():
+    """ The java interfaces implemented by proxied AbstractSimulationListeners, resolved once after the JVM is started """
+    global _LISTENER_INTERFACES
+    if _LISTENER_INTERFACES is None:
+        listeners = jpype.JPackage("info").openrocket.core.simulation.listeners
+        _LISTENER_INTERFACES = (
+            listeners.SimulationListener,
+            listeners.SimulationEventListener,
+            listeners.SimulationComputationListener,
+            jpype.java.lang.Cloneable,
+        )
+    return _LISTENER_INTERFACES
+
+def _find_virtual(cls, method_name, return_type, *parameter_types):
+    """ Looks up a public instance method of a java class as a java.lang.invoke.MethodHandle """
+    MethodHandles = jpype.java.lang.invoke.MethodHandles
+    MethodType = jpype.java.lang.invoke.MethodType
+
+    return MethodHandles.publicLookup().findVirtual(cls, method_name,
+                                                    MethodType.methodType(return_type, *parameter_types))
+
+def _find_static(cls, method_name, return_type, *parameter_types):
+    """ Looks up a public static method of a java class as a java.lang.invoke.MethodHandle """
+    MethodHandles = jpype.java.lang.invoke.MethodHandles
+    MethodType = jpype.java.lang.invoke.MethodType
+
+    return MethodHandles.publicLookup().findStatic(cls, method_name,
+                                                   MethodType.methodType(return_type, *parameter_types))
+
+def _java_function(interface, method_handle):
+    """ Wraps a MethodHandle in a java functional interface (Function, Predicate, ...). Unlike a JProxy, calling the
+        resulting object never crosses back into python, so it can be handed to java streams to do bulk work in one call.
+    """
+    return jpype.java.lang.invoke.MethodHandleProxies.asInterfaceInstance(interface, method_handle)
 
 def _get_private_field(obj, field_name):
     field = obj.getClass().getDeclaredField(field_name)